@@ -13,9 +13,10 @@ import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from collections import namedtuple
-import random
+import copy
+import os
 import logging
 from torch.utils.tensorboard import SummaryWriter
 
@@ -43,52 +44,143 @@ class DQNConfig:
     epsilon_start: float = 1.0
     epsilon_end: float = 0.01
     epsilon_decay: float = 0.995
+    warmup_steps: int = 0  # optimize steps to act purely at random before using the net
     priority_alpha: float = 0.6
     priority_beta: float = 0.4
     priority_epsilon: float = 1e-6
+    compile_train_step: bool = False  # torch.compile the forward + loss
+    quantize_inference: bool = False  # int8 CPU copy of the policy for select_action
+    inference_refresh: int = 1  # target updates between int8 refreshes
+    log_interval: int = 100  # optimize steps between TensorBoard flushes
+    # Opt-in: switches the process-wide CUDA allocator to expandable segments when
+    # the agent is constructed (not on load_model). Equivalent to launching with
+    # PYTORCH_CUDA_ALLOC_CONF=expandable_segments:True, which is the preferred route.
+    cuda_expandable_segments: bool = False
 
 class PrioritizedReplayBuffer:
-    """Implements prioritized experience replay for more efficient learning."""
+    """
+    Implements prioritized experience replay for more efficient learning.
+
+    Priorities are kept in a sum-tree (a binary segment tree flattened into
+    a single array) so that proportional sampling and priority updates are
+    O(log N) instead of a pass over the whole buffer. Transitions are stored
+    field-by-field in preallocated tensors on the training device, so a
+    sampled batch is gathered where it is consumed and only the batch
+    indices cross the host/device boundary.
+    """
     
-    def __init__(self, capacity: int, alpha: float):
+    def __init__(
+        self,
+        capacity: int,
+        alpha: float,
+        state_dim: int = 6,
+        device: Optional[torch.device] = None,
+        rng: Optional[np.random.Generator] = None
+    ):
         self.capacity = capacity
         self.alpha = alpha
-        self.priorities = np.zeros((capacity,), dtype=np.float32)
-        self.buffer: List[Transition] = []
+        self.device = device or torch.device("cpu")
+        self._rng = rng if rng is not None else np.random.default_rng()
         self.position = 0
+        self.size = 0
+        self._max_priority = 1.0
         
-    def push(self, *args) -> None:
-        """Save a transition with maximum priority."""
-        max_priority = max(self.priorities) if self.buffer else 1.0
+        self.states = torch.zeros((capacity, state_dim), device=self.device)
+        self.actions = torch.zeros((capacity,), dtype=torch.int64, device=self.device)
+        self.rewards = torch.zeros((capacity,), device=self.device)
+        self.next_states = torch.zeros((capacity, state_dim), device=self.device)
+        self.dones = torch.zeros((capacity,), device=self.device)
         
-        if len(self.buffer) < self.capacity:
-            self.buffer.append(Transition(*args))
-        else:
-            self.buffer[self.position] = Transition(*args)
+        # Leaves live at [tree_capacity, 2 * tree_capacity); node i holds the
+        # sum of nodes 2i and 2i + 1, so tree[1] is the total priority mass.
+        self._tree_capacity = 1
+        while self._tree_capacity < capacity:
+            self._tree_capacity *= 2
+        self._depth = self._tree_capacity.bit_length() - 1
+        self.tree = np.zeros(2 * self._tree_capacity, dtype=np.float64)
+        
+    def _update(self, indices: np.ndarray, values: np.ndarray) -> None:
+        """Write leaf values and propagate the sums up to the root."""
+        nodes = np.asarray(indices, dtype=np.int64) + self._tree_capacity
+        self.tree[nodes] = values
+        for _ in range(self._depth):
+            nodes //= 2
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+        
+    def _update_one(self, index: int, value: float) -> None:
+        """Scalar single-leaf _update; far cheaper than fancy indexing for one leaf."""
+        tree = self.tree
+        node = index + self._tree_capacity
+        tree[node] = value
+        while node > 1:
+            node //= 2
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+        
+    def __len__(self) -> int:
+        return self.size
+        
+    def push(self, state: State, action: Action, reward: float,
+             next_state: State, done: bool) -> None:
+        """Save a transition with maximum priority."""
+        self.states[self.position].copy_(
+            torch.from_numpy(np.asarray(state, dtype=np.float32)), non_blocking=True
+        )
+        self.next_states[self.position].copy_(
+            torch.from_numpy(np.asarray(next_state, dtype=np.float32)), non_blocking=True
+        )
+        self.actions[self.position] = action
+        self.rewards[self.position] = reward
+        self.dones[self.position] = float(done)
         
-        self.priorities[self.position] = max_priority
+        self._update_one(self.position, self._max_priority ** self.alpha)
         self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
-    def sample(self, batch_size: int, beta: float) -> Tuple[List[Transition], np.ndarray, np.ndarray]:
-        """Sample a batch of transitions based on their priorities."""
-        if len(self.buffer) == 0:
+    def sample(self, batch_size: int, beta: float) -> Tuple[Transition, np.ndarray, np.ndarray]:
+        """
+        Sample a batch of transitions based on their priorities.
+        
+        The batch is a single Transition whose fields are tensors on the
+        buffer's device with a leading batch dimension; indices and
+        importance-sampling weights stay on the host.
+        """
+        if self.size == 0:
             raise ValueError("Cannot sample from empty buffer")
             
-        priorities = self.priorities[:len(self.buffer)]
-        probabilities = priorities ** self.alpha
-        probabilities /= probabilities.sum()
+        total = self.tree[1]
+        targets = self._rng.uniform(0, total, batch_size)
+        
+        # Descend all samples through the tree together, one level per step
+        nodes = np.ones(batch_size, dtype=np.int64)
+        for _ in range(self._depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = targets >= left_sum
+            targets = np.where(go_right, targets - left_sum, targets)
+            nodes = left + go_right
+        
+        # Guard against float round-off landing on an empty leaf
+        indices = np.minimum(nodes - self._tree_capacity, self.size - 1)
         
-        indices = np.random.choice(len(self.buffer), batch_size, p=probabilities)
-        weights = (len(self.buffer) * probabilities[indices]) ** (-beta)
+        probabilities = self.tree[indices + self._tree_capacity] / total
+        weights = (self.size * probabilities) ** (-beta)
         weights /= weights.max()
         
-        batch = [self.buffer[idx] for idx in indices]
+        idx = torch.from_numpy(indices).to(self.device, non_blocking=True)
+        batch = Transition(
+            self.states[idx],
+            self.actions[idx],
+            self.rewards[idx],
+            self.next_states[idx],
+            self.dones[idx]
+        )
         return batch, indices, weights
     
     def update_priorities(self, indices: np.ndarray, priorities: np.ndarray) -> None:
-        """Update priorities for sampled transitions."""
-        for idx, priority in zip(indices, priorities):
-            self.priorities[idx] = priority
+        """Update priorities for sampled transitions in one vectorized tree write."""
+        priorities = np.asarray(priorities, dtype=np.float64).ravel()
+        self._max_priority = max(self._max_priority, float(priorities.max()))
+        self._update(indices, priorities ** self.alpha)
 
 class DQNetwork(nn.Module):
     """Neural network architecture for DQN."""
@@ -114,14 +206,26 @@ class DQNAgent:
     techniques for improved performance and stability.
     """
     
-    def __init__(self, config: DQNConfig):
+    def __init__(self, config: DQNConfig, seed: Optional[int] = None):
         self.config = config
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self._rng = np.random.default_rng(seed)
+        
+        # Opt-in: let the (process-global) caching allocator grow segments instead
+        # of carving new ones; an explicit PYTORCH_CUDA_ALLOC_CONF takes precedence.
+        if (
+            self.device.type == "cuda"
+            and config.cuda_expandable_segments
+            and "PYTORCH_CUDA_ALLOC_CONF" not in os.environ
+        ):
+            torch.cuda.memory._set_allocator_settings("expandable_segments:True")
         
         # Networks
         self.policy_net = DQNetwork(config).to(self.device)
         self.target_net = DQNetwork(config).to(self.device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self._policy_params = list(self.policy_net.parameters())
+        self._target_params = list(self.target_net.parameters())
+        self.sync_target_net()
         
         # Optimizer
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.learning_rate)
@@ -129,26 +233,140 @@ class DQNAgent:
         # Replay buffer
         self.memory = PrioritizedReplayBuffer(
             config.buffer_size, 
-            config.priority_alpha
+            config.priority_alpha,
+            config.state_dim,
+            self.device,
+            self._rng
         )
         
+        # Forward + loss (optionally compiled) and the optional int8 acting copy
+        self.inference_net: Optional[nn.Module] = None
+        self._apply_config()
+        
         # Training parameters
         self.epsilon = config.epsilon_start
         self.steps = 0
         
+        # TensorBoard writer; scalars are buffered and written in batches
+        self.writer = SummaryWriter()
+        self._log_buf: List[Tuple[int, float, float, int]] = []
+        
+    def flush_logs(self) -> None:
+        """Write buffered training scalars to TensorBoard."""
+        for step, loss, epsilon, buffer_size in self._log_buf:
+            self.writer.add_scalar("Loss", loss, step)
+            self.writer.add_scalar("Epsilon", epsilon, step)
+            self.writer.add_scalar("Buffer Size", buffer_size, step)
+        self.writer.flush()
+        self._log_buf.clear()
+        
+    def sync_target_net(self) -> None:
+        """Copy the policy weights into the target network in place."""
+        with torch.no_grad():
+            for target_param, policy_param in zip(self._target_params, self._policy_params):
+                target_param.copy_(policy_param, non_blocking=True)
+        
+    def _apply_config(self) -> None:
+        """(Re)build the state that depends on config flags rather than on weights."""
+        if self.config.inference_refresh < 1:
+            raise ValueError(
+                f"inference_refresh must be >= 1, got {self.config.inference_refresh}"
+            )
+        
+        # Forward + loss, optionally compiled into fused kernels / CUDA graphs
+        self._train_step = self._td_loss
+        if self.config.compile_train_step:
+            self._train_step = torch.compile(
+                self._td_loss, mode="reduce-overhead", fullgraph=True
+            )
+        
+        # Optional int8 snapshot of the policy used only for acting
+        if self.config.quantize_inference:
+            self.refresh_inference_net()
+        else:
+            self.inference_net = None
+        
+    def refresh_inference_net(self) -> None:
+        """Rebuild the dynamically quantized CPU copy of the policy network."""
+        cpu_net = copy.deepcopy(self.policy_net).cpu().eval()
+        self.inference_net = torch.ao.quantization.quantize_dynamic(
+            cpu_net, {nn.Linear}, dtype=torch.qint8
+        )
+        
+    def _exploring_only(self) -> bool:
+        """True while every action is random anyway, so the net can be skipped."""
+        return self.steps < self.config.warmup_steps or self.epsilon >= 1.0
+        
     def select_action(self, state: State) -> Action:
         """Select an action using epsilon-greedy policy."""
-        if random.random() < self.epsilon:
-            return random.randrange(self.config.action_dim)
+        if self._exploring_only() or self._rng.random() < self.epsilon:
+            return int(self._rng.integers(self.config.action_dim))
+            
+        if self.inference_net is not None:
+            with torch.no_grad():
+                state_tensor = torch.from_numpy(np.asarray(state, dtype=np.float32)).unsqueeze(0)
+                return self.inference_net(state_tensor).argmax(1).item()
             
         with torch.no_grad():
-            state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+            state_tensor = torch.from_numpy(
+                np.ascontiguousarray(state, dtype=np.float32)
+            ).unsqueeze(0).to(self.device, non_blocking=True)
             q_values = self.policy_net(state_tensor)
             return q_values.max(1)[1].item()
     
+    def select_actions(self, states: np.ndarray) -> np.ndarray:
+        """Select epsilon-greedy actions for a batch of states in one forward pass."""
+        if self._exploring_only():
+            return self._rng.integers(self.config.action_dim, size=len(states))
+            
+        states = np.asarray(states, dtype=np.float32)
+        with torch.no_grad():
+            q_values = self.policy_net(torch.from_numpy(states).to(self.device))
+            actions = q_values.argmax(1).cpu().numpy()
+        explore = self._rng.random(len(states)) < self.epsilon
+        actions[explore] = self._rng.integers(self.config.action_dim, size=explore.sum())
+        return actions
+    
+    def _td_loss(
+        self,
+        state_batch: torch.Tensor,
+        action_batch: torch.Tensor,
+        reward_batch: torch.Tensor,
+        next_state_batch: torch.Tensor,
+        done_batch: torch.Tensor,
+        weights: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Compute the weighted Double DQN loss and per-sample TD errors.
+        
+        Uses tensor ops only so it can be traced by torch.compile; the batch
+        size is fixed, so compiled CUDA graphs are reused every step.
+        """
+        reward_batch = reward_batch.unsqueeze(1)
+        done_batch = done_batch.unsqueeze(1)
+        
+        # One policy forward over current and next states together
+        batch_size = state_batch.shape[0]
+        q_all = self.policy_net(torch.cat([state_batch, next_state_batch], 0))
+        current_q_values = q_all[:batch_size].gather(1, action_batch.unsqueeze(1))
+        
+        # Double Q-learning update
+        with torch.no_grad():
+            next_actions = q_all[batch_size:].detach().argmax(1, keepdim=True)
+            next_state_values = self.target_net(next_state_batch).gather(1, next_actions)
+            expected_q_values = reward_batch + (1 - done_batch) * self.config.gamma * next_state_values
+        
+        # Huber loss with importance sampling weights, sharing one difference
+        # with the TD errors used for the new priorities
+        diff = expected_q_values - current_q_values
+        td_errors = diff.abs()
+        huber = torch.where(td_errors < 1.0, 0.5 * diff * diff, td_errors - 0.5)
+        loss = (weights * huber).mean()
+        return loss, td_errors
+    
     def optimize_model(self) -> float:
         """Perform one step of optimization on the DQN."""
-        if len(self.memory.buffer) < self.config.batch_size:
+        if len(self.memory) < self.config.batch_size:
             return 0.0
             
         # Sample batch with priorities
@@ -157,27 +375,11 @@ class DQNAgent:
             self.config.priority_beta
         )
         
-        # Prepare batch tensors
-        state_batch = torch.FloatTensor([t.state for t in batch]).to(self.device)
-        action_batch = torch.LongTensor([t.action for t in batch]).to(self.device)
-        reward_batch = torch.FloatTensor([t.reward for t in batch]).to(self.device)
-        next_state_batch = torch.FloatTensor([t.next_state for t in batch]).to(self.device)
-        done_batch = torch.FloatTensor([t.done for t in batch]).to(self.device)
-        
-        # Double Q-learning update
-        with torch.no_grad():
-            next_actions = self.policy_net(next_state_batch).max(1)[1].unsqueeze(1)
-            next_state_values = self.target_net(next_state_batch).gather(1, next_actions)
-            expected_q_values = reward_batch + (1 - done_batch) * self.config.gamma * next_state_values
-        
-        # Compute loss with importance sampling weights
-        current_q_values = self.policy_net(state_batch).gather(1, action_batch.unsqueeze(1))
-        td_errors = (expected_q_values - current_q_values).abs()
-        loss = (torch.FloatTensor(weights).to(self.device) * F.smooth_l1_loss(
-            current_q_values, 
-            expected_q_values,
-            reduction='none'
-        )).mean()
+        # Batch tensors are already on the training device
+        weights = torch.from_numpy(weights.astype(np.float32)).unsqueeze(1).to(self.device, non_blocking=True)
+        if self.config.compile_train_step:
+            torch.compiler.cudagraph_mark_step_begin()
+        loss, td_errors = self._train_step(*batch, weights)
         
         # Optimize
         self.optimizer.zero_grad()
@@ -188,12 +390,15 @@ class DQNAgent:
         # Update priorities
         self.memory.update_priorities(
             indices,
-            (td_errors + self.config.priority_epsilon).detach().cpu().numpy()
+            (td_errors.squeeze(1) + self.config.priority_epsilon).detach().cpu().numpy()
         )
         
         # Update target network
         if self.steps % self.config.target_update == 0:
-            self.target_net.load_state_dict(self.policy_net.state_dict())
+            self.sync_target_net()
+            refresh_every = self.config.target_update * self.config.inference_refresh
+            if self.inference_net is not None and self.steps % refresh_every == 0:
+                self.refresh_inference_net()
             
         # Decay epsilon
         self.epsilon = max(
@@ -202,7 +407,14 @@ class DQNAgent:
         )
         
         self.steps += 1
-        return loss.item()
+        
+        # TensorBoard logging
+        loss_value = loss.item()
+        self._log_buf.append((self.steps, loss_value, self.epsilon, len(self.memory)))
+        if len(self._log_buf) >= self.config.log_interval:
+            self.flush_logs()
+            
+        return loss_value
     
     def save_model(self, path: str) -> None:
         """Save model checkpoint."""
@@ -212,19 +424,30 @@ class DQNAgent:
             'optimizer': self.optimizer.state_dict(),
             'epsilon': self.epsilon,
             'steps': self.steps,
-            'config': self.config
-        }, path)
+            'config': asdict(self.config)
+        }, path, _use_new_zipfile_serialization=True)
+        self.flush_logs()
         logger.info(f"Model saved to {path}")
     
     def load_model(self, path: str) -> None:
-        """Load model checkpoint."""
+        """
+        Load model checkpoint.
+        
+        The checkpoint's config replaces the current one and the compiled
+        train step and int8 inference copy are rebuilt to match it. The
+        replay buffer is not part of the checkpoint and is kept as is.
+        """
         try:
-            checkpoint = torch.load(path)
+            checkpoint = torch.load(
+                path, map_location=self.device, weights_only=True, mmap=True
+            )
+            self.config = DQNConfig(**checkpoint['config'])
             self.policy_net.load_state_dict(checkpoint['policy_net'])
             self.target_net.load_state_dict(checkpoint['target_net'])
             self.optimizer.load_state_dict(checkpoint['optimizer'])
             self.epsilon = checkpoint['epsilon']
             self.steps = checkpoint['steps']
+            self._apply_config()
             logger.info(f"Model loaded from {path}")
         except Exception as e:
             logger.error(f"Error loading model: {e}")
@@ -232,54 +455,3 @@ class DQNAgent:
 
 # TODO: Add support for different network architectures
 # TODO: Implement Dueling DQN variant
-class DQNAgent:
-    # ... (rest of the class unchanged)
-
-    def __init__(self, config: DQNConfig):
-        self.config = config
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.policy_net = DQNetwork(config).to(self.device)
-        self.target_net = DQNetwork(config).to(self.device)
-        self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.optimizer = optim.Adam(self.policy_net.parameters(), lr=config.learning_rate)
-        self.memory = PrioritizedReplayBuffer(config.buffer_size, config.priority_alpha)
-        self.epsilon = config.epsilon_start
-        self.steps = 0
-        self.writer = SummaryWriter()  # TensorBoard writer
-
-    def optimize_model(self) -> float:
-        if len(self.memory.buffer) < self.config.batch_size:
-            return 0.0
-        batch, indices, weights = self.memory.sample(self.config.batch_size, self.config.priority_beta)
-        state_batch = torch.FloatTensor([t.state for t in batch]).to(self.device)
-        action_batch = torch.LongTensor([t.action for t in batch]).to(self.device)
-        reward_batch = torch.FloatTensor([t.reward for t in batch]).to(self.device)
-        next_state_batch = torch.FloatTensor([t.next_state for t in batch]).to(self.device)
-        done_batch = torch.FloatTensor([t.done for t in batch]).to(self.device)
-        with torch.no_grad():
-            next_actions = self.policy_net(next_state_batch).max(1)[1].unsqueeze(1)
-            next_state_values = self.target_net(next_state_batch).gather(1, next_actions)
-            expected_q_values = reward_batch + (1 - done_batch) * self.config.gamma * next_state_values
-        current_q_values = self.policy_net(state_batch).gather(1, action_batch.unsqueeze(1))
-        td_errors = (expected_q_values - current_q_values).abs()
-        loss = (torch.FloatTensor(weights).to(self.device) * F.smooth_l1_loss(
-            current_q_values, 
-            expected_q_values,
-            reduction='none'
-        )).mean()
-        self.optimizer.zero_grad()
-        loss.backward()
-        torch.nn.utils.clip_grad_norm_(self.policy_net.parameters(), 1.0)
-        self.optimizer.step()
-        self.memory.update_priorities(indices, (td_errors + self.config.priority_epsilon).detach().cpu().numpy())
-        if self.steps % self.config.target_update == 0:
-            self.target_net.load_state_dict(self.policy_net.state_dict())
-        self.epsilon = max(self.config.epsilon_end, self.epsilon * self.config.epsilon_decay)
-        self.steps += 1
-
-        # TensorBoard logging
-        self.writer.add_scalar("Loss", loss.item(), self.steps)
-        self.writer.add_scalar("Epsilon", self.epsilon, self.steps)
-        self.writer.add_scalar("Buffer Size", len(self.memory.buffer), self.steps)
-
-        return loss.item()
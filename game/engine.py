@@ -1,11 +1,32 @@
 from dataclasses import dataclass
-from typing import Tuple, Optional, Dict
+from typing import Tuple, Optional, Dict, List, Union
 import numpy as np
 import logging
 from enum import Enum
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 logger = logging.getLogger(__name__)
 
+# Trig lookup tables. Paddle hits map hit positions in [-0.5, 1.5] (relative
+# to the paddle, generous enough for any ball overlap) onto deflection angles
+# in [-pi/3, pi/3]; serves pick uniformly among angles in [-pi/4, pi/4]. An
+# odd size keeps an exact zero angle for dead-centre hits.
+_LUT_SIZE = 1025
+_DEFLECT_ANGLES = (np.linspace(-0.5, 1.5, _LUT_SIZE) - 0.5) * np.pi / 3
+_DEFLECT_COS = np.cos(_DEFLECT_ANGLES)
+_DEFLECT_SIN = np.sin(_DEFLECT_ANGLES)
+_SERVE_ANGLES = np.linspace(-np.pi / 4, np.pi / 4, _LUT_SIZE)
+_SERVE_COS = np.cos(_SERVE_ANGLES)
+_SERVE_SIN = np.sin(_SERVE_ANGLES)
+_DEFLECT_SCALE = (_LUT_SIZE - 1) / 2.0
+
 class GameMode(Enum):
     SINGLE_PLAYER = "single"
     MULTIPLAYER = "multi"
@@ -27,8 +48,7 @@ class GameConfig:
 @dataclass
 class GameState:
     """Represents the current state of the game."""
-    ball_pos: Tuple[float, float]
-    ball_vel: Tuple[float, float]
+    balls: np.ndarray  # (n_balls, 4) rows of x, y, vx, vy
     left_paddle_pos: float
     right_paddle_pos: float
     player_score: int
@@ -36,45 +56,143 @@ class GameState:
     game_mode: GameMode
     is_paused: bool = False
     ball_speed: float = 7.0
+    
+    @property
+    def ball_pos(self) -> np.ndarray:
+        """Position of the primary ball, as a view into ``balls``."""
+        return self.balls[0, :2]
+    
+    @ball_pos.setter
+    def ball_pos(self, pos: Tuple[float, float]) -> None:
+        self.balls[0, :2] = pos
+        
+    @property
+    def ball_vel(self) -> np.ndarray:
+        """Velocity of the primary ball, as a view into ``balls``."""
+        return self.balls[0, 2:]
+    
+    @ball_vel.setter
+    def ball_vel(self, vel: Tuple[float, float]) -> None:
+        self.balls[0, 2:] = vel
 
 class PhysicsEngine:
-    """Handles game physics calculations."""
+    """
+    Handles game physics calculations.
+    
+    All methods operate on every ball at once: ball state is an
+    ``(n_balls, 4)`` array that is updated in place, and collision checks
+    return boolean masks.
+    """
     
     def __init__(self, config: GameConfig):
         self.config = config
     
-    def update_ball_position(self, state: GameState) -> Tuple[float, float]:
-        """Update ball position based on velocity."""
-        if state.is_paused:
-            return state.ball_pos
-            
-        new_x = state.ball_pos[0] + state.ball_vel[0]
-        new_y = state.ball_pos[1] + state.ball_vel[1]
-        return (new_x, new_y)
+    def update_ball_position(self, balls: np.ndarray) -> None:
+        """Advance ball positions one frame by their velocities, in place."""
+        balls[:, :2] += balls[:, 2:]
     
-    def check_wall_collision(self, pos: Tuple[float, float]) -> bool:
-        """Check if ball collides with top/bottom walls."""
-        return pos[1] <= 0 or pos[1] + self.config.ball_size >= self.config.height
+    def check_wall_collision(self, pos: np.ndarray) -> np.ndarray:
+        """Mask of balls colliding with the top/bottom walls."""
+        y = pos[:, 1]
+        return (y <= 0) | (y + self.config.ball_size >= self.config.height)
     
     def check_paddle_collision(
         self,
-        ball_pos: Tuple[float, float],
-        paddle_pos: float,
+        pos: np.ndarray,
+        paddle_pos: Union[float, np.ndarray],
         is_left: bool
-    ) -> bool:
-        """Check if ball collides with a paddle."""
+    ) -> np.ndarray:
+        """Mask of balls colliding with a paddle."""
         paddle_x = (
             self.config.paddle_width 
             if is_left else 
             self.config.width - 2 * self.config.paddle_width
         )
+        x, y = pos[:, 0], pos[:, 1]
         
         return (
-            ball_pos[0] < paddle_x + self.config.paddle_width
-            and ball_pos[0] + self.config.ball_size > paddle_x
-            and ball_pos[1] < paddle_pos + self.config.paddle_height
-            and ball_pos[1] + self.config.ball_size > paddle_pos
+            (x < paddle_x + self.config.paddle_width)
+            & (x + self.config.ball_size > paddle_x)
+            & (y < paddle_pos + self.config.paddle_height)
+            & (y + self.config.ball_size > paddle_pos)
         )
+    
+    def deflect(
+        self,
+        hit_y: np.ndarray,
+        paddle_pos: Union[float, np.ndarray],
+        is_left: bool,
+        speed: Union[float, np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Velocity after a paddle hit; the angle depends on the hit location."""
+        hit_pos = (hit_y - paddle_pos) / self.config.paddle_height
+        lut_idx = np.clip(
+            np.rint((hit_pos + 0.5) * _DEFLECT_SCALE), 0, _LUT_SIZE - 1
+        ).astype(np.intp)
+        direction = 1.0 if is_left else -1.0
+        return direction * speed * _DEFLECT_COS[lut_idx], speed * _DEFLECT_SIN[lut_idx]
+
+@njit(cache=True, fastmath=True)
+def _step_ball(ball, left_paddle, right_paddle, ball_speed, cfg):
+    """
+    Advance a single ``(x, y, vx, vy)`` ball row by one frame, in place.
+    
+    Scalar-only for single-game play. ``cfg`` is the tuple built by
+    ``GameEngine._pack_config``. Returns ``(ball_speed, outcome)`` where
+    outcome is 1 if the player scored, -1 if the AI scored and 0 otherwise.
+    """
+    width, height, paddle_width, paddle_height, ball_size, max_speed, speed_increment = cfg
+    x = float(ball[0])
+    y = float(ball[1])
+    vx = float(ball[2])
+    vy = float(ball[3])
+    
+    new_x = x + vx
+    new_y = y + vy
+    
+    # Wall collisions
+    if new_y <= 0 or new_y + ball_size >= height:
+        vy = -vy
+        new_x = x + vx
+        new_y = y + vy
+        
+    # Paddle collisions, left then right
+    for side in range(2):
+        if side == 0:
+            paddle_x = paddle_width
+            paddle_pos = left_paddle
+            direction = 1.0
+        else:
+            paddle_x = width - 2 * paddle_width
+            paddle_pos = right_paddle
+            direction = -1.0
+            
+        if (
+            new_x < paddle_x + paddle_width
+            and new_x + ball_size > paddle_x
+            and new_y < paddle_pos + paddle_height
+            and new_y + ball_size > paddle_pos
+        ):
+            hit_pos = (new_y - paddle_pos) / paddle_height
+            lut_idx = min(max(int(round((hit_pos + 0.5) * _DEFLECT_SCALE)), 0), _LUT_SIZE - 1)
+            ball_speed = min(ball_speed * speed_increment, max_speed)
+            vx = direction * ball_speed * _DEFLECT_COS[lut_idx]
+            vy = ball_speed * _DEFLECT_SIN[lut_idx]
+            new_x = x + vx
+            new_y = y + vy
+            
+    ball[0] = new_x
+    ball[1] = new_y
+    ball[2] = vx
+    ball[3] = vy
+    
+    # Scoring
+    outcome = 0
+    if new_x <= 0:
+        outcome = -1
+    elif new_x + ball_size >= width:
+        outcome = 1
+    return ball_speed, outcome
 
 class GameEngine:
     """
@@ -84,16 +202,36 @@ class GameEngine:
     independent of rendering and input handling.
     """
     
-    def __init__(self, config: GameConfig):
+    def __init__(self, config: GameConfig, seed: Optional[int] = None):
         self.config = config
         self.physics = PhysicsEngine(config)
+        self._rng = np.random.default_rng(seed)
+        self._pack_config()
         self.reset_game()
         
+    def _pack_config(self) -> None:
+        """
+        Snapshot the config as a homogeneous float tuple for ``_step_ball``.
+        
+        Must be called again whenever a physics-relevant config field changes.
+        """
+        self._physics_cfg = (
+            float(self.config.width),
+            float(self.config.height),
+            float(self.config.paddle_width),
+            float(self.config.paddle_height),
+            float(self.config.ball_size),
+            float(self.config.max_speed),
+            float(self.config.speed_increment)
+        )
+        
     def reset_game(self) -> None:
         """Reset game to initial state."""
         self.state = GameState(
-            ball_pos=(self.config.width/2, self.config.height/2),
-            ball_vel=(self.config.base_speed, 0),
+            balls=np.array(
+                [[self.config.width/2, self.config.height/2, self.config.base_speed, 0]],
+                dtype=np.float32
+            ),
             left_paddle_pos=self.config.height/2 - self.config.paddle_height/2,
             right_paddle_pos=self.config.height/2 - self.config.paddle_height/2,
             player_score=0,
@@ -107,61 +245,34 @@ class GameEngine:
         if self.state.is_paused:
             return
             
-        # Update ball position
-        new_pos = self.physics.update_ball_position(self.state)
+        left_paddle = float(self.state.left_paddle_pos)
+        right_paddle = float(self.state.right_paddle_pos)
         
-        # Handle collisions
-        if self.physics.check_wall_collision(new_pos):
-            self.state.ball_vel = (
-                self.state.ball_vel[0],
-                -self.state.ball_vel[1]
-            )
-            new_pos = self.physics.update_ball_position(self.state)
-            
-        # Paddle collisions
-        for is_left in (True, False):
-            paddle_pos = (
-                self.state.left_paddle_pos 
-                if is_left else 
-                self.state.right_paddle_pos
+        # Each ball goes through the compiled scalar kernel; there is
+        # normally only one, so this beats the vectorized PhysicsEngine path.
+        for i, ball in enumerate(self.state.balls):
+            self.state.ball_speed, outcome = _step_ball(
+                ball, left_paddle, right_paddle, float(self.state.ball_speed),
+                self._physics_cfg
             )
             
-            if self.physics.check_paddle_collision(new_pos, paddle_pos, is_left):
-                # Calculate deflection angle based on hit position
-                hit_pos = (new_pos[1] - paddle_pos) / self.config.paddle_height
-                angle = (hit_pos - 0.5) * np.pi / 3
-                
-                # Update velocity with increased speed
-                speed = min(
-                    self.state.ball_speed * self.config.speed_increment,
-                    self.config.max_speed
-                )
-                self.state.ball_speed = speed
-                self.state.ball_vel = (
-                    -speed * np.cos(angle) if is_left else speed * np.cos(angle),
-                    speed * np.sin(angle)
-                )
-                new_pos = self.physics.update_ball_position(self.state)
-                
-        # Scoring
-        if new_pos[0] <= 0:
-            self.state.ai_score += 1
-            self._reset_ball(serve_left=True)
-        elif new_pos[0] + self.config.ball_size >= self.config.width:
-            self.state.player_score += 1
-            self._reset_ball(serve_left=False)
-        else:
-            self.state.ball_pos = new_pos
+            if outcome < 0:
+                self.state.ai_score += 1
+                self._reset_ball(serve_left=True, ball=i)
+            elif outcome > 0:
+                self.state.player_score += 1
+                self._reset_ball(serve_left=False, ball=i)
             
-    def _reset_ball(self, serve_left: bool) -> None:
-        """Reset ball position after scoring."""
-        self.state.ball_pos = (self.config.width/2, self.config.height/2)
+    def _reset_ball(self, serve_left: bool, ball: int = 0) -> None:
+        """Reset a ball's position after scoring."""
         self.state.ball_speed = self.config.base_speed
-        angle = np.random.uniform(-np.pi/4, np.pi/4)
-        self.state.ball_vel = (
-            -self.config.base_speed * np.cos(angle) if serve_left
-            else self.config.base_speed * np.cos(angle),
-            self.config.base_speed * np.sin(angle)
+        lut_idx = self._rng.integers(_LUT_SIZE)
+        self.state.balls[ball] = (
+            self.config.width/2,
+            self.config.height/2,
+            -self.config.base_speed * _SERVE_COS[lut_idx] if serve_left
+            else self.config.base_speed * _SERVE_COS[lut_idx],
+            self.config.base_speed * _SERVE_SIN[lut_idx]
         )
         
     def move_paddle(self, is_left: bool, amount: float) -> None:
@@ -184,8 +295,9 @@ class GameEngine:
     def get_game_state(self) -> Dict:
         """Return current game state for AI or rendering."""
         return {
-            'ball_pos': self.state.ball_pos,
-            'ball_vel': self.state.ball_vel,
+            'ball_pos': tuple(self.state.ball_pos),
+            'ball_vel': tuple(self.state.ball_vel),
+            'balls': self.state.balls.copy(),
             'left_paddle': self.state.left_paddle_pos,
             'right_paddle': self.state.right_paddle_pos,
             'scores': (self.state.player_score, self.state.ai_score),
@@ -199,6 +311,108 @@ class GameEngine:
             or self.state.ai_score >= self.config.winning_score
         )
 
+class VectorGameEngine:
+    """
+    Steps many independent games at once for AI training.
+    
+    Every per-game field is an array indexed by env id, so one frame for all
+    games is a fixed sequence of NumPy operations and the agent receives its
+    observations as a single ``(num_envs, 6)`` batch.
+    """
+    
+    def __init__(self, config: GameConfig, num_envs: int, seed: Optional[int] = None):
+        self.config = config
+        self.num_envs = num_envs
+        self.physics = PhysicsEngine(config)
+        self._rng = np.random.default_rng(seed)
+        self.reset()
+        
+    def reset(self) -> None:
+        """Reset every game to its initial state."""
+        n = self.num_envs
+        self.balls = np.zeros((n, 4), dtype=np.float32)
+        self.balls[:] = (self.config.width/2, self.config.height/2, self.config.base_speed, 0)
+        self.paddles = np.full(
+            (n, 2), self.config.height/2 - self.config.paddle_height/2, dtype=np.float32
+        )  # left, right
+        self.paddle_vel = np.zeros((n, 2), dtype=np.float32)
+        self.scores = np.zeros((n, 2), dtype=np.int64)  # player, ai
+        self.ball_speed = np.full(n, self.config.base_speed, dtype=np.float32)
+        
+    def update(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Advance all games by one frame.
+        
+        Returns masks of the games where the player and the AI scored.
+        """
+        balls = self.balls
+        pos, vel = balls[:, :2], balls[:, 2:]
+        self.physics.update_ball_position(balls)
+        
+        # A bounce redoes the frame's move with the reflected velocity
+        wall_hits = self.physics.check_wall_collision(pos)
+        balls[wall_hits, 3] *= -1
+        balls[wall_hits, 1] += 2 * balls[wall_hits, 3]
+        
+        for side, is_left in ((0, True), (1, False)):
+            paddle_pos = self.paddles[:, side]
+            hits = self.physics.check_paddle_collision(pos, paddle_pos, is_left)
+            if hits.any():
+                start = pos[hits] - vel[hits]
+                speed = np.minimum(
+                    self.ball_speed[hits] * self.config.speed_increment,
+                    self.config.max_speed
+                )
+                self.ball_speed[hits] = speed
+                balls[hits, 2], balls[hits, 3] = self.physics.deflect(
+                    pos[hits, 1], paddle_pos[hits], is_left, speed
+                )
+                pos[hits] = start + vel[hits]
+                
+        ai_scored = pos[:, 0] <= 0
+        player_scored = pos[:, 0] + self.config.ball_size >= self.config.width
+        self.scores[player_scored, 0] += 1
+        self.scores[ai_scored, 1] += 1
+        self._reset_balls(ai_scored, serve_left=True)
+        self._reset_balls(player_scored, serve_left=False)
+        return player_scored, ai_scored
+        
+    def _reset_balls(self, mask: np.ndarray, serve_left: bool) -> None:
+        """Serve fresh balls in the games selected by ``mask``."""
+        count = np.count_nonzero(mask)
+        if not count:
+            return
+        lut_idx = self._rng.integers(_LUT_SIZE, size=count)
+        direction = -1.0 if serve_left else 1.0
+        self.ball_speed[mask] = self.config.base_speed
+        self.balls[mask, 0] = self.config.width/2
+        self.balls[mask, 1] = self.config.height/2
+        self.balls[mask, 2] = direction * self.config.base_speed * _SERVE_COS[lut_idx]
+        self.balls[mask, 3] = self.config.base_speed * _SERVE_SIN[lut_idx]
+        
+    def move_paddles(self, is_left: bool, amounts: np.ndarray) -> None:
+        """Move one side's paddle in every game while keeping them in bounds."""
+        side = 0 if is_left else 1
+        old_pos = self.paddles[:, side].copy()
+        np.clip(
+            old_pos + amounts,
+            0,
+            self.config.height - self.config.paddle_height,
+            out=self.paddles[:, side]
+        )
+        self.paddle_vel[:, side] = self.paddles[:, side] - old_pos
+        
+    def get_observations(self, is_left: bool = False) -> np.ndarray:
+        """Return the ``(num_envs, 6)`` agent state batch for one paddle."""
+        side = 0 if is_left else 1
+        return np.column_stack(
+            (self.balls, self.paddles[:, side], self.paddle_vel[:, side])
+        )
+        
+    def is_game_over(self) -> np.ndarray:
+        """Mask of games where either side reached the winning score."""
+        return (self.scores >= self.config.winning_score).any(axis=1)
+
 # TODO: Add replay system for game state recording
 # TODO: Implement more sophisticated physics (spin, friction)
 # Power-up types
@@ -215,55 +429,82 @@ class PowerUp:
     active: bool = True
     duration: int = 300  # frames
 
+_POWERUP_TYPES = list(PowerUpType)
+
 class PowerUpManager:
-    """Handles spawning and applying power-ups."""
-    def __init__(self, config: GameConfig):
+    """
+    Handles spawning and applying power-ups.
+    
+    Power-ups are stored in fixed-capacity parallel arrays (position, type,
+    remaining duration, active flag); a slot is reused once its power-up is
+    collected or expires.
+    """
+    def __init__(
+        self,
+        config: GameConfig,
+        capacity: int = 16,
+        rng: Optional[np.random.Generator] = None
+    ):
         self.config = config
-        self.active_powerups: Dict[str, PowerUp] = {}
+        self.capacity = capacity
+        self._rng = rng if rng is not None else np.random.default_rng()
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.types = np.zeros(capacity, dtype=np.int8)  # index into PowerUpType
+        self.durations = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def _powerup(self, slot: int) -> PowerUp:
+        """Build a PowerUp record for one slot."""
+        return PowerUp(
+            type=_POWERUP_TYPES[self.types[slot]],
+            pos=(float(self.positions[slot, 0]), float(self.positions[slot, 1])),
+            active=bool(self.active[slot]),
+            duration=int(self.durations[slot])
+        )
+
+    def get_active_powerups(self) -> List[PowerUp]:
+        """Return records for every power-up currently on the field."""
+        return [self._powerup(slot) for slot in np.flatnonzero(self.active)]
 
     def spawn_powerup(self) -> Optional[PowerUp]:
-        # Randomly spawn a power-up in the field
-        powerup_type = np.random.choice(list(PowerUpType))
-        pos = (
-            np.random.uniform(self.config.width * 0.25, self.config.width * 0.75),
-            np.random.uniform(self.config.height * 0.2, self.config.height * 0.8)
+        # Randomly spawn a power-up in the first free slot, if any
+        free = np.flatnonzero(~self.active)
+        if free.size == 0:
+            return None
+        slot = free[0]
+        self.types[slot] = self._rng.integers(len(_POWERUP_TYPES))
+        self.positions[slot] = (
+            self._rng.uniform(self.config.width * 0.25, self.config.width * 0.75),
+            self._rng.uniform(self.config.height * 0.2, self.config.height * 0.8)
         )
-        powerup = PowerUp(type=powerup_type, pos=pos)
-        self.active_powerups[str(pos)] = powerup
-        return powerup
+        self.durations[slot] = PowerUp.duration  # dataclass default
+        self.active[slot] = True
+        return self._powerup(slot)
 
     def check_collision(self, ball_pos: Tuple[float, float]) -> Optional[PowerUp]:
-        for key, powerup in self.active_powerups.items():
-            if powerup.active:
-                px, py = powerup.pos
-                if (
-                    abs(ball_pos[0] - px) < 20 and
-                    abs(ball_pos[1] - py) < 20
-                ):
-                    powerup.active = False
-                    return powerup
-        return None
+        hits = self.active & (np.abs(self.positions - ball_pos) < 20).all(axis=1)
+        if not hits.any():
+            return None
+        slot = int(np.argmax(hits))
+        self.active[slot] = False
+        return self._powerup(slot)
 
     def update(self):
-        # Remove expired power-ups
-        for powerup in list(self.active_powerups.values()):
-            if not powerup.active:
-                continue
-            powerup.duration -= 1
-            if powerup.duration <= 0:
-                powerup.active = False
+        # Expire power-ups whose duration has run out
+        self.durations[self.active] -= 1
+        self.active &= self.durations > 0
 
 # Extend GameEngine for power-ups and special modes
 class GameEngineWithPowerUps(GameEngine):
-    def __init__(self, config: GameConfig):
-        super().__init__(config)
-        self.powerup_manager = PowerUpManager(config)
+    def __init__(self, config: GameConfig, seed: Optional[int] = None):
+        super().__init__(config, seed)
+        self.powerup_manager = PowerUpManager(config, rng=self._rng)
         self.special_mode_active = False
 
     def update(self) -> None:
         super().update()
         # Randomly spawn power-ups
-        if np.random.rand() < 0.005:
+        if self._rng.random() < 0.005:
             self.powerup_manager.spawn_powerup()
         self.powerup_manager.update()
         # Check for power-up collision
@@ -276,6 +517,7 @@ class GameEngineWithPowerUps(GameEngine):
             self.state.ball_speed = min(self.state.ball_speed * 1.5, self.config.max_speed)
         elif powerup.type == PowerUpType.PADDLE_SIZE:
             self.config.paddle_height = min(self.config.paddle_height * 1.5, self.config.height / 2)
+            self._pack_config()
         elif powerup.type == PowerUpType.MULTI_BALL:
             # Example: activate special mode
             self.special_mode_active = True
@@ -284,7 +526,7 @@ class GameEngineWithPowerUps(GameEngine):
         state = super().get_game_state()
         state['powerups'] = [
             {'type': p.type.value, 'pos': p.pos, 'active': p.active}
-            for p in self.powerup_manager.active_powerups.values()
+            for p in self.powerup_manager.get_active_powerups()
         ]
         state['special_mode'] = self.special_mode_active
         return state
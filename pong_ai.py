@@ -4,6 +4,17 @@ import random
 import math
 import sys
 import os
+import queue
+import threading
+from dataclasses import dataclass
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the Q-table kernels then run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 # --- Settings ---
 SCREEN_WIDTH = 800
@@ -18,10 +29,13 @@ ELASTICITY = 0.95
 SPIN_FACTOR = 0.25
 FRICTION = 0.98
 FONT_NAME = 'freesansbold.ttf'
+COURT_COLOR = (30,30,30)
+MENU_COLOR = (20,20,40)
+END_COLOR = (50,20,20)
 WIN_SCORE = 7
 
 # --- Q-Learning Settings ---
-STATE_BINS = (12, 12, 6, 6)  # Ball X/Y, Ball VX/VY, Paddle Y
+STATE_BINS = (12, 12, 6, 6, 12)  # Ball X/Y, Ball VX/VY, Paddle Y
 ACTIONS = [0, 1, 2]  # Up, Down, Stay
 ALPHA = 0.1
 GAMMA = 0.95
@@ -47,14 +61,34 @@ score_sound = load_sound('score.wav') if os.path.exists('assets/score.wav') else
 start_sound = load_sound('start.wav') if os.path.exists('assets/start.wav') else None
 
 # --- Utility functions ---
-def draw_text(surface, text, size, x, y, color=(255,255,255)):
-    font = pygame.font.Font(FONT_NAME, size)
-    text_surface = font.render(text, True, color)
-    rect = text_surface.get_rect()
-    rect.center = (x, y)
-    surface.blit(text_surface, rect)
+_font_cache = {}  # size -> Font
+_text_cache = {}  # (text, size, color, background) -> rendered Surface
+
+def render_text(text, size, color=(255,255,255), background=None):
+    # With a solid background the text is rendered opaque and blits without alpha blending;
+    # without one it keeps per-pixel alpha so it can sit over anything.
+    key = (text, size, color, background)
+    surf = _text_cache.get(key)
+    if surf is None:
+        font = _font_cache.get(size)
+        if font is None:
+            font = _font_cache[size] = pygame.font.Font(FONT_NAME, size)
+        if background is None:
+            surf = font.render(text, True, color).convert_alpha()
+        else:
+            surf = font.render(text, True, color, background).convert()
+        _text_cache[key] = surf
+    return surf
+
+def draw_text(surface, text, size, x, y, color=(255,255,255), background=None):
+    surf = render_text(text, size, color, background)
+    return surface.blit(surf, surf.get_rect(center=(x, y)))
 
 # --- Game Objects ---
+# Serve directions: (cos, sin) pairs spanning [-0.3*pi, 0.3*pi]
+_N_ANGLES = 256
+_ANGLES = [(math.cos(a), math.sin(a)) for a in np.linspace(-0.3*math.pi, 0.3*math.pi, _N_ANGLES).tolist()]
+
 class Paddle:
     def __init__(self, x, y, is_player=True):
         self.x = x
@@ -63,26 +97,30 @@ class Paddle:
         self.height = PADDLE_HEIGHT
         self.is_player = is_player
         self.speed = PADDLE_SPEED
-        self.vel = 0
+        self._max_y = SCREEN_HEIGHT - self.height
+        self._rect = pygame.Rect(x, int(y), self.width, self.height)  # reused by draw
 
     def move(self, direction):
-        self.vel = direction * self.speed
-        self.y += self.vel
-        self.y = max(0, min(SCREEN_HEIGHT - self.height, self.y))
+        y = self.y + direction * self.speed
+        hi = self._max_y
+        self.y = 0 if y < 0 else (hi if y > hi else y)
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, (255,255,255), pygame.Rect(self.x, int(self.y), self.width, self.height), border_radius=8)
+    def draw(self, surface, y=None):
+        self._rect.y = int(self.y if y is None else y)
+        return pygame.draw.rect(surface, (255,255,255), self._rect, border_radius=8)
 
 class Ball:
     def __init__(self):
+        self._rect = pygame.Rect(0, 0, BALL_SIZE, BALL_SIZE)  # reused by draw
         self.reset()
 
     def reset(self):
         self.x = SCREEN_WIDTH // 2 - BALL_SIZE // 2
         self.y = SCREEN_HEIGHT // 2 - BALL_SIZE // 2
-        angle = random.uniform(-0.3, 0.3) * math.pi
-        self.vx = BALL_SPEED * random.choice([-1, 1]) * math.cos(angle)
-        self.vy = BALL_SPEED * math.sin(angle)
+        c, s = _ANGLES[random.randrange(_N_ANGLES)]
+        sign = 1 if random.getrandbits(1) else -1
+        self.vx = BALL_SPEED * sign * c
+        self.vy = BALL_SPEED * s
         self.spin = 0
 
     def move(self):
@@ -90,17 +128,78 @@ class Ball:
         self.y += self.vy
         self.vy *= FRICTION  # Simulate friction/air resistance
 
-    def draw(self, surface):
-        pygame.draw.ellipse(surface, (0,255,255), pygame.Rect(int(self.x), int(self.y), BALL_SIZE, BALL_SIZE))
+    def draw(self, surface, x=None, y=None):
+        rect = self._rect
+        rect.x = int(self.x if x is None else x)
+        rect.y = int(self.y if y is None else y)
+        return pygame.draw.ellipse(surface, (0,255,255), rect)
 
     def get_rect(self):
         return pygame.Rect(self.x, self.y, BALL_SIZE, BALL_SIZE)
 
+# --- Q-Learning kernels (3 actions, 5-axis state) ---
+# Kernels carry explicit signatures so they compile eagerly at import (and are
+# cached on disk) instead of stalling the first AI tick.
+_STATE = 'int64, int64, int64, int64, int64'
+
+# The Q-table is flat and C-ordered over STATE_BINS + (actions,); these are its strides
+Q_TABLE_SIZE = int(np.prod(STATE_BINS)) * len(ACTIONS)
+# Q-values are int16 fixed point (Q7.8): stored = round(value * _Q_SCALE), range about +/-128
+_Q_SCALE = 256.0
+_Q_STRIDES = tuple(int(np.prod(STATE_BINS[i+1:])) * len(ACTIONS) for i in range(len(STATE_BINS)))
+
+# Equal-width binning: bin = (value + offset) * scale, clipped to [0, bins-1]
+_BIN_SCALES = (
+    STATE_BINS[0] / SCREEN_WIDTH,
+    STATE_BINS[1] / SCREEN_HEIGHT,
+    STATE_BINS[2] / (2 * BALL_SPEED),
+    STATE_BINS[3] / (2 * BALL_SPEED),
+    STATE_BINS[4] / SCREEN_HEIGHT,
+)
+_BIN_OFFSETS = (0.0, 0.0, float(BALL_SPEED), float(BALL_SPEED), 0.0)
+_BIN_MAX = tuple(b - 1 for b in STATE_BINS)
+
+@njit('int64(float64, float64, float64, int64)', cache=True)
+def _bin(v, s, o, m):
+    i = int((v + o) * s)
+    return 0 if i < 0 else (m if i > m else i)
+
+@njit('UniTuple(int64, 5)(float64, float64, float64, float64, float64)', cache=True)
+def _discretize(bx, by, bvx, bvy, py):
+    return (_bin(bx, _BIN_SCALES[0], _BIN_OFFSETS[0], _BIN_MAX[0]),
+            _bin(by, _BIN_SCALES[1], _BIN_OFFSETS[1], _BIN_MAX[1]),
+            _bin(bvx, _BIN_SCALES[2], _BIN_OFFSETS[2], _BIN_MAX[2]),
+            _bin(bvy, _BIN_SCALES[3], _BIN_OFFSETS[3], _BIN_MAX[3]),
+            _bin(py, _BIN_SCALES[4], _BIN_OFFSETS[4], _BIN_MAX[4]))
+
+@njit(f'int64({_STATE})', cache=True)
+def _q_row(s0, s1, s2, s3, s4):
+    return s0*_Q_STRIDES[0] + s1*_Q_STRIDES[1] + s2*_Q_STRIDES[2] + s3*_Q_STRIDES[3] + s4*_Q_STRIDES[4]
+
+@njit(f'int64(int16[::1], {_STATE})', cache=True)
+def _argmax3(q, s0, s1, s2, s3, s4):
+    base = _q_row(s0, s1, s2, s3, s4)
+    a, b, c = q[base], q[base + 1], q[base + 2]
+    if a >= b:
+        return 0 if a >= c else 2
+    return 1 if b >= c else 2
+
+@njit(f'void(int16[::1], {_STATE}, int64, float64, float64, float64, {_STATE})', cache=True, fastmath=True)
+def _q_update(q, s0, s1, s2, s3, s4, a, reward, alpha, gamma, n0, n1, n2, n3, n4):
+    idx = _q_row(s0, s1, s2, s3, s4) + a
+    nxt = _q_row(n0, n1, n2, n3, n4)
+    future_q = max(q[nxt], q[nxt + 1], q[nxt + 2])
+    old_q = q[idx]
+    # TD update carried out in scaled units, then rounded and saturated back to int16
+    new_q = round(old_q + alpha * (reward * _Q_SCALE + gamma * future_q - old_q))
+    q[idx] = min(max(new_q, -32768), 32767)
+
 # --- Q-Learning AI Agent ---
+_RNG_BLOCK = 1024  # exploration draws generated per refill
+
 class QAgent:
     def __init__(self, difficulty='medium'):
-        bins = STATE_BINS
-        self.q_table = np.zeros(bins + (len(ACTIONS),))  # Discretized Q-table
+        self.q_table = np.zeros(Q_TABLE_SIZE, dtype=np.int16)  # Flat discretized Q-table, Q7.8 fixed point
         self.alpha = ALPHA
         self.gamma = GAMMA
         self.epsilon = EPSILON_START
@@ -109,34 +208,101 @@ class QAgent:
         self.last_state = None
         self.last_action = None
         self.difficulty = difficulty
+        # Epsilon decays in batches of _decay_every rewards by the equivalent compound factor
+        self._decay_accum = 0
+        self._decay_every = 64
+        self._decay_batch = self.epsilon_decay ** self._decay_every
+        # Exploration randomness is drawn in blocks and consumed one entry per call
+        self._rng = np.random.default_rng()
+        self._refill_rng()
+        self._refill_actions()
+
+    def _refill_rng(self):
+        self._rng_buf = self._rng.random(_RNG_BLOCK).tolist()
+        self._rng_i = 0
+
+    def _refill_actions(self):
+        self._act_buf = self._rng.integers(0, len(ACTIONS), _RNG_BLOCK).tolist()
+        self._act_i = 0
+
+    def q_values(self):
+        """The Q-table as floats, shaped STATE_BINS + (actions,)."""
+        return (self.q_table / _Q_SCALE).reshape(STATE_BINS + (len(ACTIONS),))
 
     def discretize_state(self, ball, paddle):
-        bx = int(ball.x * STATE_BINS[0] / SCREEN_WIDTH)
-        by = int(ball.y * STATE_BINS[1] / SCREEN_HEIGHT)
-        bvx = int((ball.vx + BALL_SPEED) * STATE_BINS[2] / (2 * BALL_SPEED))
-        bvy = int((ball.vy + BALL_SPEED) * STATE_BINS[3] / (2 * BALL_SPEED))
-        py = int(paddle.y * STATE_BINS[1] / SCREEN_HEIGHT)
-        return (bx, by, bvx, bvy, py)
+        return _discretize(ball.x, ball.y, ball.vx, ball.vy, paddle.y)
 
     def select_action(self, state):
-        if random.random() < self.epsilon:
-            if self.difficulty == 'easy':
-                return random.choice(ACTIONS)
-            elif self.difficulty == 'medium':
-                # Slightly bias towards correct move but still random
-                return random.choice(ACTIONS)
-            else:
-                return random.choice(ACTIONS)
+        r = self._rng_buf[self._rng_i]
+        self._rng_i += 1
+        if self._rng_i >= _RNG_BLOCK:
+            self._refill_rng()
+        if r < self.epsilon:
+            # Difficulty only changes epsilon; exploratory moves are uniform
+            action = self._act_buf[self._act_i]
+            self._act_i += 1
+            if self._act_i >= _RNG_BLOCK:
+                self._refill_actions()
+            return action
         else:
-            return np.argmax(self.q_table[state])
+            return _argmax3(self.q_table, *state)
 
     def update(self, old_state, action, reward, new_state):
-        old_q = self.q_table[old_state + (action,)]
-        future_q = np.max(self.q_table[new_state])
-        self.q_table[old_state + (action,)] += self.alpha * (reward + self.gamma * future_q - old_q)
+        _q_update(self.q_table, *old_state, action, reward, self.alpha, self.gamma, *new_state)
 
     def decay_epsilon(self):
-        self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
+        self._decay_accum += 1
+        if self._decay_accum >= self._decay_every:
+            self._decay_accum = 0
+            self.epsilon = max(self.epsilon_min, self.epsilon * self._decay_batch)
+
+# --- Rendering ---
+@dataclass(frozen=True)
+class Snapshot:
+    """Everything a frame needs, copied out of the game so it can be composed on another thread."""
+    lp_y: float
+    rp_y: float
+    bx: float
+    by: float
+    player_score: int
+    ai_score: int
+    difficulty: str
+    game_over: bool = False
+
+class RenderThread(threading.Thread):
+    """Composes the most recent Snapshot into the game's offscreen canvas; stale frames are dropped.
+
+    Only drawing into plain Surfaces happens here. SDL expects the window to be driven
+    from the thread that created it, so the main loop calls PongGame.present() itself.
+    """
+    def __init__(self, game):
+        super().__init__(daemon=True)
+        self.game = game
+        self.snapshots = queue.Queue(maxsize=1)
+        self.alive = True
+
+    def submit(self, snap):
+        try:
+            self.snapshots.put_nowait(snap)
+        except queue.Full:
+            # Drop the frame the renderer has not picked up yet
+            try:
+                self.snapshots.get_nowait()
+            except queue.Empty:
+                pass
+            self.snapshots.put_nowait(snap)
+
+    def run(self):
+        while self.alive:
+            try:
+                snap = self.snapshots.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self.game.compose(snap)
+
+    def stop(self):
+        self.alive = False
+        self.join()
 
 # --- Game Logic ---
 class PongGame:
@@ -150,6 +316,31 @@ class PongGame:
         self.difficulty = 'medium'
         self.menu = True
         self.running = True
+        # Paddles never move horizontally, so their x extent, bounce direction and
+        # the x the ball is ejected to are fixed: (paddle, left, right, direction, eject_x)
+        lp, rp = self.left_paddle, self.right_paddle
+        self._paddles_iter = (
+            (lp, lp.x, lp.x + PADDLE_WIDTH, 1, lp.x + PADDLE_WIDTH + 1),
+            (rp, rp.x, rp.x + PADDLE_WIDTH, -1, rp.x - BALL_SIZE - 1),
+        )
+        self._hit_cooldown = 0  # frames until the bounce sound may play again
+        # Score digits are rendered once and blitted every frame
+        # (per-pixel alpha, not opaque: the ball can pass underneath them)
+        self._digit_surfs = [render_text(str(d), 44) for d in range(10)]
+        # Static court (fill + center dotted line) pre-rendered once
+        self._bg = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self._bg.fill(COURT_COLOR)
+        for i in range(0, SCREEN_HEIGHT, 30):
+            pygame.draw.line(self._bg, (90,90,90), (SCREEN_WIDTH//2, i), (SCREEN_WIDTH//2, i+18), 4)
+        # Frames are composed into an offscreen canvas (possibly on the render thread)
+        # and copied to the display by present() on the main thread
+        self._canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self._canvas_lock = threading.Lock()
+        # Dirty-rect rendering: only regions drawn last frame or this frame are pushed to the display
+        self._full_redraw = True  # set whenever another screen (menu, end) has covered the court
+        self._present_full = False
+        self._prev_rects = []
+        self._dirty_rects = []
 
     def set_difficulty(self, diff):
         self.difficulty = diff
@@ -182,35 +373,35 @@ class PongGame:
         self.agent.update(self.agent.last_state, self.agent.last_action, reward, new_state)
         self.agent.decay_epsilon()
 
+    def _play_bounce(self):
+        # One sound per contact, even if the ball overlaps for several frames
+        if bounce_sound and self._hit_cooldown == 0:
+            bounce_sound.play()
+            self._hit_cooldown = 3
+
     def handle_collisions(self):
-        ball_rect = self.ball.get_rect()
-        lp_rect = pygame.Rect(self.left_paddle.x, self.left_paddle.y, self.left_paddle.width, self.left_paddle.height)
-        rp_rect = pygame.Rect(self.right_paddle.x, self.right_paddle.y, self.right_paddle.width, self.right_paddle.height)
+        if self._hit_cooldown:
+            self._hit_cooldown -= 1
+        ball = self.ball
+        bx, by = ball.x, ball.y
 
         # Ball hits top/bottom
         if self.ball.y <= 0 or self.ball.y + BALL_SIZE >= SCREEN_HEIGHT:
             self.ball.vy *= -ELASTICITY
             self.ball.vy += random.uniform(-SPIN_FACTOR, SPIN_FACTOR)  # Add spin
-            if bounce_sound: bounce_sound.play()
-
-        # Ball hits left paddle
-        if ball_rect.colliderect(lp_rect):
-            offset = (self.ball.y + BALL_SIZE/2) - (self.left_paddle.y + PADDLE_HEIGHT/2)
-            norm_offset = offset / (PADDLE_HEIGHT/2)
-            self.ball.vx = abs(self.ball.vx) * ELASTICITY
-            self.ball.vy += norm_offset * BALL_SPEED * SPIN_FACTOR
-            self.ball.x = self.left_paddle.x + PADDLE_WIDTH + 1
-            if bounce_sound: bounce_sound.play()
-
-        # Ball hits right paddle
-        if ball_rect.colliderect(rp_rect):
-            offset = (self.ball.y + BALL_SIZE/2) - (self.right_paddle.y + PADDLE_HEIGHT/2)
-            norm_offset = offset / (PADDLE_HEIGHT/2)
-            self.ball.vx = -abs(self.ball.vx) * ELASTICITY
-            self.ball.vy += norm_offset * BALL_SPEED * SPIN_FACTOR
-            self.ball.x = self.right_paddle.x - BALL_SIZE - 1
-            self.reward_ai(1.0)  # Reward for hitting ball
-            if bounce_sound: bounce_sound.play()
+            self._play_bounce()
+
+        # Ball hits a paddle (inline AABB overlap)
+        for paddle, left, right, direction, eject_x in self._paddles_iter:
+            py = paddle.y
+            if bx < right and bx + BALL_SIZE > left and by < py + PADDLE_HEIGHT and by + BALL_SIZE > py:
+                norm_offset = ((by + BALL_SIZE/2) - (py + PADDLE_HEIGHT/2)) / (PADDLE_HEIGHT/2)
+                ball.vx = direction * abs(ball.vx) * ELASTICITY
+                ball.vy += norm_offset * BALL_SPEED * SPIN_FACTOR
+                ball.x = eject_x
+                if direction < 0:
+                    self.reward_ai(1.0)  # Reward the AI (right paddle) for hitting the ball
+                self._play_bounce()
 
         # Ball goes past left paddle (AI scores)
         if self.ball.x <= 0:
@@ -239,46 +430,210 @@ class PongGame:
             self.ball.vx *= 1.08
             self.ball.vy *= 1.08
 
+    def snapshot(self):
+        return Snapshot(self.left_paddle.y, self.right_paddle.y, self.ball.x, self.ball.y,
+                        self.player_score, self.ai_score, self.difficulty, self.is_game_over())
+
     def draw(self):
-        screen.fill((30,30,30))
-        # Center dotted line
-        for i in range(0, SCREEN_HEIGHT, 30):
-            pygame.draw.line(screen, (90,90,90), (SCREEN_WIDTH//2, i), (SCREEN_WIDTH//2, i+18), 4)
-        self.left_paddle.draw(screen)
-        self.right_paddle.draw(screen)
-        self.ball.draw(screen)
-        # Scores
-        draw_text(screen, str(self.player_score), 44, SCREEN_WIDTH//2 - 60, 40)
-        draw_text(screen, str(self.ai_score), 44, SCREEN_WIDTH//2 + 60, 40)
-        # Difficulty
-        draw_text(screen, f"Difficulty: {self.difficulty.capitalize()}", 20, SCREEN_WIDTH//2, SCREEN_HEIGHT - 30)
-        pygame.display.flip()
+        self.draw_from_snapshot(self.snapshot())
+
+    def draw_from_snapshot(self, snap):
+        self.compose(snap)
+        self.present()
+
+    def compose(self, snap):
+        """Draw a frame into the offscreen canvas and queue the changed regions for present().
+
+        Touches no display state, so it may run on a render thread.
+        """
+        canvas = self._canvas
+        with self._canvas_lock:
+            if snap.game_over:
+                self._compose_end(snap.player_score, snap.ai_score)
+                return
+            full = self._full_redraw
+            if full:
+                canvas.blit(self._bg, (0, 0))
+            else:
+                # Restore the background under everything drawn last frame
+                for rect in self._prev_rects:
+                    canvas.blit(self._bg, rect, rect)
+                self._dirty_rects.extend(self._prev_rects)
+            drawn = [
+                self.left_paddle.draw(canvas, snap.lp_y),
+                self.right_paddle.draw(canvas, snap.rp_y),
+                self.ball.draw(canvas, snap.bx, snap.by),
+                # Scores
+                self._draw_score(canvas, snap.player_score, SCREEN_WIDTH//2 - 60, 40),
+                self._draw_score(canvas, snap.ai_score, SCREEN_WIDTH//2 + 60, 40),
+                # Difficulty
+                draw_text(canvas, f"Difficulty: {snap.difficulty.capitalize()}", 20, SCREEN_WIDTH//2, SCREEN_HEIGHT - 30),
+            ]
+            self._prev_rects = drawn
+            if full:
+                self._full_redraw = False
+                self._present_full = True
+            else:
+                self._dirty_rects.extend(drawn)
+
+    def present(self):
+        """Copy queued canvas regions to the display. SDL display calls must stay on the main thread."""
+        with self._canvas_lock:
+            if self._present_full:
+                screen.blit(self._canvas, (0, 0))
+                rects = None
+            elif self._dirty_rects:
+                rects = self._dirty_rects
+                for rect in rects:
+                    screen.blit(self._canvas, rect, rect)
+            else:
+                return
+            self._present_full = False
+            self._dirty_rects = []
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+    def request_full_present(self):
+        """Push the whole canvas on the next present(), e.g. after the window was exposed."""
+        with self._canvas_lock:
+            self._present_full = True
+
+    def _draw_score(self, surface, score, x, y):
+        if score < 10:
+            surf = self._digit_surfs[score]
+            return surface.blit(surf, surf.get_rect(center=(x, y)))
+        return draw_text(surface, str(score), 44, x, y)
 
     def draw_menu(self):
-        screen.fill((20,20,40))
-        draw_text(screen, "Pong ML", 64, SCREEN_WIDTH//2, SCREEN_HEIGHT//3)
-        draw_text(screen, "Select Difficulty", 32, SCREEN_WIDTH//2, SCREEN_HEIGHT//2-30)
-        draw_text(screen, "1: Easy", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+20)
-        draw_text(screen, "2: Medium", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+60)
-        draw_text(screen, "3: Hard", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+100)
-        draw_text(screen, "Press SPACE to Start", 24, SCREEN_WIDTH//2, SCREEN_HEIGHT-60)
+        self._full_redraw = True
+        screen.fill(MENU_COLOR)
+        draw_text(screen, "Pong ML", 64, SCREEN_WIDTH//2, SCREEN_HEIGHT//3, background=MENU_COLOR)
+        draw_text(screen, "Select Difficulty", 32, SCREEN_WIDTH//2, SCREEN_HEIGHT//2-30, background=MENU_COLOR)
+        draw_text(screen, "1: Easy", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+20, background=MENU_COLOR)
+        draw_text(screen, "2: Medium", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+60, background=MENU_COLOR)
+        draw_text(screen, "3: Hard", 28, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+100, background=MENU_COLOR)
+        draw_text(screen, "Press SPACE to Start", 24, SCREEN_WIDTH//2, SCREEN_HEIGHT-60, background=MENU_COLOR)
         pygame.display.flip()
 
     def draw_end(self):
-        winner = "Player" if self.player_score > self.ai_score else "AI"
-        screen.fill((50,20,20))
-        draw_text(screen, f"{winner} Wins!", 48, SCREEN_WIDTH//2, SCREEN_HEIGHT//2-40)
-        draw_text(screen, f"Player: {self.player_score}  AI: {self.ai_score}", 32, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+10)
-        draw_text(screen, "Press R to Restart or Q to Quit", 24, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+70)
-        pygame.display.flip()
+        with self._canvas_lock:
+            self._compose_end(self.player_score, self.ai_score)
+        self.present()
+
+    def _compose_end(self, player_score, ai_score):
+        # Caller holds _canvas_lock
+        canvas = self._canvas
+        winner = "Player" if player_score > ai_score else "AI"
+        self._full_redraw = True
+        self._present_full = True
+        canvas.fill(END_COLOR)
+        draw_text(canvas, f"{winner} Wins!", 48, SCREEN_WIDTH//2, SCREEN_HEIGHT//2-40, background=END_COLOR)
+        draw_text(canvas, f"Player: {player_score}  AI: {ai_score}", 32, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+10, background=END_COLOR)
+        draw_text(canvas, "Press R to Restart or Q to Quit", 24, SCREEN_WIDTH//2, SCREEN_HEIGHT//2+70, background=END_COLOR)
 
     def is_game_over(self):
         return self.player_score >= WIN_SCORE or self.ai_score >= WIN_SCORE
 
+# --- Batched headless games (self-play training) ---
+class BatchedPong:
+    """N games stored as parallel arrays (structure of arrays) and stepped with one vectorized update."""
+    LP_X = 30
+    RP_X = SCREEN_WIDTH - 30 - PADDLE_WIDTH
+    _SERVE = np.array(_ANGLES, dtype=np.float32)  # (N_ANGLES, 2) cos/sin
+
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.rng = np.random.default_rng(seed)
+        self.bx = np.zeros(n, dtype=np.float32)
+        self.by = np.zeros(n, dtype=np.float32)
+        self.vx = np.zeros(n, dtype=np.float32)
+        self.vy = np.zeros(n, dtype=np.float32)
+        self.lp_y = np.full(n, SCREEN_HEIGHT//2 - PADDLE_HEIGHT//2, dtype=np.float32)
+        self.rp_y = np.full(n, SCREEN_HEIGHT//2 - PADDLE_HEIGHT//2, dtype=np.float32)
+        self.player_score = np.zeros(n, dtype=np.int32)
+        self.ai_score = np.zeros(n, dtype=np.int32)
+        self.reset()
+
+    def reset(self, mask=None):
+        """Re-centre paddles and serve a new ball in the games selected by mask (all by default)."""
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        k = len(idx)
+        self.lp_y[idx] = SCREEN_HEIGHT//2 - PADDLE_HEIGHT//2
+        self.rp_y[idx] = SCREEN_HEIGHT//2 - PADDLE_HEIGHT//2
+        self.bx[idx] = SCREEN_WIDTH // 2 - BALL_SIZE // 2
+        self.by[idx] = SCREEN_HEIGHT // 2 - BALL_SIZE // 2
+        cs = self._SERVE[self.rng.integers(0, _N_ANGLES, k)]
+        sign = self.rng.integers(0, 2, k) * 2 - 1
+        self.vx[idx] = BALL_SPEED * sign * cs[:, 0]
+        self.vy[idx] = BALL_SPEED * cs[:, 1]
+
+    def move_paddles(self, left_moves, right_moves):
+        self.lp_y += np.asarray(left_moves, dtype=np.float32) * PADDLE_SPEED
+        self.rp_y += np.asarray(right_moves, dtype=np.float32) * PADDLE_SPEED
+        np.clip(self.lp_y, 0, SCREEN_HEIGHT - PADDLE_HEIGHT, out=self.lp_y)
+        np.clip(self.rp_y, 0, SCREEN_HEIGHT - PADDLE_HEIGHT, out=self.rp_y)
+
+    def move_all(self):
+        self.bx += self.vx
+        self.by += self.vy
+        self.vy *= FRICTION
+
+    def handle_collisions(self):
+        """Bounce balls off walls and paddles.
+
+        Returns (player_scored, ai_scored, ai_hit) masks; ai_hit marks right-paddle
+        hits, which PongGame rewards the AI for.
+        """
+        bx, by = self.bx, self.by
+
+        wall = (by <= 0) | (by + BALL_SIZE >= SCREEN_HEIGHT)
+        self.vy[wall] *= -ELASTICITY
+        self.vy[wall] += self.rng.uniform(-SPIN_FACTOR, SPIN_FACTOR, np.count_nonzero(wall))
+
+        hits = []
+        for paddle_x, paddle_y, direction in ((self.LP_X, self.lp_y, 1), (self.RP_X, self.rp_y, -1)):
+            hit = ((bx < paddle_x + PADDLE_WIDTH) & (bx + BALL_SIZE > paddle_x)
+                   & (by < paddle_y + PADDLE_HEIGHT) & (by + BALL_SIZE > paddle_y))
+            hits.append(hit)
+            if hit.any():
+                norm_offset = ((by[hit] + BALL_SIZE/2) - (paddle_y[hit] + PADDLE_HEIGHT/2)) / (PADDLE_HEIGHT/2)
+                self.vx[hit] = direction * np.abs(self.vx[hit]) * ELASTICITY
+                self.vy[hit] += norm_offset * BALL_SPEED * SPIN_FACTOR
+                self.bx[hit] = paddle_x + PADDLE_WIDTH + 1 if direction > 0 else paddle_x - BALL_SIZE - 1
+
+        ai_scored = self.bx <= 0
+        player_scored = self.bx + BALL_SIZE >= SCREEN_WIDTH
+        self.ai_score += ai_scored
+        self.player_score += player_scored
+        scored = ai_scored | player_scored
+        if scored.any():
+            self.reset(scored)
+        return player_scored, ai_scored, hits[1]
+
+    def step(self, left_moves, right_moves):
+        self.move_paddles(left_moves, right_moves)
+        self.move_all()
+        outcome = self.handle_collisions()
+        # Difficulty: speed up ball after certain score (as in PongGame.update)
+        total = self.player_score + self.ai_score
+        fast = (total > 0) & (total % 5 == 0)
+        self.vx[fast] *= 1.08
+        self.vy[fast] *= 1.08
+        return outcome
+
+    def discretize(self, paddle_y=None):
+        """Q-table states for every game as an (N, 5) int array, binned like QAgent.discretize_state."""
+        py = self.rp_y if paddle_y is None else paddle_y
+        vals = np.stack([self.bx, self.by, self.vx, self.vy, py], axis=1).astype(np.float64)
+        idx = ((vals + _BIN_OFFSETS) * _BIN_SCALES).astype(np.intp)
+        return np.clip(idx, 0, _BIN_MAX, out=idx)
+
 # --- Mobile Touch Controls (basic) ---
-def get_player_move(paddle):
+def get_player_move(paddle, events):
     move = 0
-    for event in pygame.event.get():
+    for event in events:
         if event.type == pygame.QUIT:
             pygame.quit(); sys.exit()
         elif event.type == pygame.KEYDOWN:
@@ -301,6 +656,8 @@ def get_player_move(paddle):
     return move
 
 # --- Main Loop ---
+EXPOSE_EVENTS = (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE)
+
 def main():
     game = PongGame()
     selected_diff = None
@@ -318,25 +675,39 @@ def main():
                     game.menu = False
                     if start_sound: start_sound.play()
         clock.tick(FPS)
-    # Game loop
+    # Game loop: events are polled exactly once per frame; frames are composed on the
+    # render thread and presented here, on the thread that owns the window
+    renderer = RenderThread(game)
+    renderer.start()
+
+    def quit_game():
+        renderer.stop()
+        pygame.quit(); sys.exit()
+
+    game_over = False
     while game.running:
-        player_move = get_player_move(game.left_paddle)
-        game.update(player_move)
-        game.draw()
-        if game.is_game_over():
-            game.draw_end()
-            while True:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT: pygame.quit(); sys.exit()
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_r:
-                            game.player_score = 0
-                            game.ai_score = 0
-                            game.reset()
-                            break
-                        elif event.key == pygame.K_q:
-                            pygame.quit(); sys.exit()
-                clock.tick(FPS)
+        events = pygame.event.get()
+        if any(event.type == pygame.QUIT for event in events): quit_game()
+        if any(event.type in EXPOSE_EVENTS for event in events):
+            # Window contents were lost (uncovered / restored): repaint everything
+            game.request_full_present()
+        if game_over:
+            for event in events:
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_r:
+                        game.player_score = 0
+                        game.ai_score = 0
+                        game.reset()
+                        game_over = False
+                    elif event.key == pygame.K_q:
+                        quit_game()
+        else:
+            player_move = get_player_move(game.left_paddle, events)
+            game.update(player_move)
+            snap = game.snapshot()
+            renderer.submit(snap)
+            game_over = snap.game_over
+        game.present()
         clock.tick(FPS)
 
 if __name__ == '__main__':
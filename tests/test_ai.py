@@ -43,10 +43,36 @@ def test_experience_replay(replay_buffer):
     
     # Sample batch
     batch, indices, weights = replay_buffer.sample(5, 0.4)
-    assert len(batch) == 5
+    assert batch.state.shape == (5, 6)
+    assert batch.next_state.shape == (5, 6)
+    assert len(batch.action) == 5
     assert len(indices) == 5
     assert len(weights) == 5
 
+def test_prioritized_sampling(replay_buffer):
+    """Test that sampling follows the stored priorities."""
+    for _ in range(10):
+        replay_buffer.push(np.random.random(6), 0, 1.0, np.random.random(6), False)
+    
+    # Give one transition nearly all of the priority mass
+    replay_buffer.update_priorities(np.arange(10), np.full(10, 1e-6))
+    replay_buffer.update_priorities(np.array([3]), np.array([1.0]))
+    
+    _, indices, _ = replay_buffer.sample(100, 0.4)
+    assert (indices == 3).mean() > 0.9
+    assert indices.max() < 10
+
+def test_push_keeps_tree_sums(replay_buffer):
+    """Single-leaf pushes keep every internal node equal to the sum of its children."""
+    for i in range(37):
+        replay_buffer.push(np.random.random(6), 0, 1.0, np.random.random(6), False)
+        if i == 20:
+            replay_buffer.update_priorities(np.array([4, 9]), np.array([3.0, 0.5]))
+    
+    tree, n = replay_buffer.tree, replay_buffer._tree_capacity
+    assert np.allclose(tree[1:n], tree[2:2 * n:2] + tree[3:2 * n:2])
+    assert tree[1] == pytest.approx(tree[n:].sum())
+
 def test_model_save_load(agent, tmp_path):
     """Test model checkpoint operations."""
     # Save model
@@ -63,6 +89,69 @@ def test_model_save_load(agent, tmp_path):
                       new_agent.policy_net.parameters()):
         assert torch.allclose(p1, p2)
 
+def test_model_load_applies_config_flags(tmp_path):
+    """Loading a checkpoint rebuilds the state controlled by its config flags."""
+    save_path = tmp_path / "model.pt"
+    DQNAgent(DQNConfig(quantize_inference=True)).save_model(str(save_path))
+    
+    loaded = DQNAgent(DQNConfig(compile_train_step=True))
+    loaded.load_model(str(save_path))
+    assert loaded.config.quantize_inference
+    assert loaded.inference_net is not None
+    assert not loaded.config.compile_train_step
+    assert loaded._train_step == loaded._td_loss
+    
+    # And back: a plain checkpoint drops the int8 copy
+    plain_path = tmp_path / "plain.pt"
+    DQNAgent(DQNConfig()).save_model(str(plain_path))
+    loaded.load_model(str(plain_path))
+    assert not loaded.config.quantize_inference
+    assert loaded.inference_net is None
+
+def test_quantized_inference_select_action(monkeypatch):
+    """With quantize_inference, greedy actions come from the int8 copy."""
+    agent = DQNAgent(DQNConfig(quantize_inference=True), seed=0)
+    agent.epsilon = 0.0
+    
+    def fail(*args, **kwargs):
+        raise AssertionError("policy_net should not be used for acting")
+    monkeypatch.setattr(agent.policy_net, "forward", fail)
+    
+    state = np.random.random(agent.config.state_dim).astype(np.float32)
+    with torch.no_grad():
+        expected = agent.inference_net(torch.from_numpy(state).unsqueeze(0)).argmax(1).item()
+    assert agent.select_action(state) == expected
+
+def test_inference_refresh_must_be_positive():
+    """A zero refresh interval is rejected instead of dividing by zero later."""
+    with pytest.raises(ValueError):
+        DQNAgent(DQNConfig(quantize_inference=True, inference_refresh=0))
+
+def test_warmup_skips_policy_forward(monkeypatch):
+    """During warmup actions are random without a forward; afterwards they are greedy."""
+    agent = DQNAgent(DQNConfig(warmup_steps=5), seed=0)
+    agent.epsilon = 0.0
+    calls = []
+    forward = agent.policy_net.forward
+    def counting_forward(x):
+        calls.append(len(x))
+        return forward(x)
+    monkeypatch.setattr(agent.policy_net, "forward", counting_forward)
+    
+    states = np.random.random((8, agent.config.state_dim)).astype(np.float32)
+    for steps in range(5):
+        agent.steps = steps
+        agent.select_action(states[0])
+        agent.select_actions(states)
+    assert calls == []
+    
+    agent.steps = 5
+    with torch.no_grad():
+        greedy = forward(torch.from_numpy(states).to(agent.device)).argmax(1).cpu().numpy()
+    assert agent.select_action(states[0]) == greedy[0]
+    assert (agent.select_actions(states) == greedy).all()
+    assert calls == [1, 8]
+
 def test_optimization_step(agent):
     """Test single optimization step."""
     # Fill buffer with some experiences
@@ -1,5 +1,7 @@
 import pytest
-from pongverse.game.engine import GameEngine, GameConfig, GameState, GameMode
+from pongverse.game.engine import (
+    GameEngine, GameConfig, GameState, GameMode, VectorGameEngine, PowerUpManager
+)
 import numpy as np
 
 @pytest.fixture
@@ -75,6 +77,50 @@ def test_paddle_collision(game):
     game.update()
     assert game.state.ball_vel[0] > 0  # Ball should bounce
 
+def test_multi_ball_physics(game):
+    """Test that every ball is advanced and bounced independently."""
+    game.state.balls = np.array([
+        [game.config.width / 2, 2, 0, -5],
+        [game.config.width / 2, game.config.height / 2, 3, 4],
+    ], dtype=np.float32)
+    
+    game.update()
+    assert game.state.balls[0, 3] > 0  # Top wall bounce
+    assert game.state.balls[1, 3] == 4  # Untouched
+    assert game.state.balls[1, 0] == game.config.width / 2 + 3
+
+def test_vector_engine(game):
+    """Test that batched games step and score independently."""
+    envs = VectorGameEngine(game.config, 3)
+    envs.balls[0, 0] = game.config.width + 10
+    envs.balls[1, 0] = -10
+    
+    player_scored, ai_scored = envs.update()
+    assert list(player_scored) == [True, False, False]
+    assert list(ai_scored) == [False, True, False]
+    assert envs.scores.tolist() == [[1, 0], [0, 1], [0, 0]]
+    assert envs.get_observations().shape == (3, 6)
+    
+    envs.move_paddles(False, np.array([-1000, 0, 1000]))
+    assert envs.paddles[0, 1] == 0
+    assert envs.paddles[2, 1] == game.config.height - game.config.paddle_height
+
+def test_powerup_lifecycle(game):
+    """Test power-up spawning, collection and expiry."""
+    manager = PowerUpManager(game.config, capacity=2)
+    first = manager.spawn_powerup()
+    second = manager.spawn_powerup()
+    assert manager.spawn_powerup() is None  # Capacity reached
+    
+    collected = manager.check_collision(first.pos)
+    assert collected.type == first.type
+    assert not collected.active
+    assert len(manager.get_active_powerups()) == 1
+    
+    for _ in range(second.duration):
+        manager.update()
+    assert manager.get_active_powerups() == []
+
 def test_game_over(game):
     """Test game over condition."""
     game.state.player_score = game.config.winning_score - 1
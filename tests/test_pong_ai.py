@@ -0,0 +1,137 @@
+import os
+
+# pong_ai opens a window and the mixer at import time
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pytest
+import numpy as np
+from pongverse import pong_ai
+from pongverse.pong_ai import (
+    BatchedPong, PongGame, QAgent, BALL_SIZE, ELASTICITY, EPSILON_DECAY, EPSILON_MIN, PADDLE_WIDTH,
+    SCREEN_WIDTH, SPIN_FACTOR, STATE_BINS, _argmax3, _discretize, _q_row, _q_update
+)
+
+@pytest.fixture
+def batch():
+    """Three headless games with balls parked mid-court."""
+    games = BatchedPong(3, seed=0)
+    games.bx[:] = SCREEN_WIDTH // 2
+    games.by[:] = 200
+    games.vx[:] = 3
+    games.vy[:] = 1
+    return games
+
+def test_batched_wall_bounce(batch):
+    """Balls touching the top wall bounce back with elasticity and spin."""
+    batch.by[0] = -1
+    batch.vy[0] = -3
+    batch.handle_collisions()
+    
+    assert batch.vy[0] == pytest.approx(3 * ELASTICITY, abs=SPIN_FACTOR + 1e-6)
+    assert batch.vy[1] == 1  # Other games untouched
+
+def test_batched_paddle_eject(batch):
+    """Paddle hits reflect the ball and push it clear of the paddle."""
+    batch.lp_y[0] = batch.rp_y[1] = 150
+    batch.bx[0], batch.vx[0] = BatchedPong.LP_X + 2, -3
+    batch.bx[1], batch.vx[1] = BatchedPong.RP_X - BALL_SIZE + 2, 3
+    _, _, ai_hit = batch.handle_collisions()
+    
+    assert batch.bx[0] == BatchedPong.LP_X + PADDLE_WIDTH + 1
+    assert batch.vx[0] > 0
+    assert batch.bx[1] == BatchedPong.RP_X - BALL_SIZE - 1
+    assert batch.vx[1] < 0
+    assert ai_hit.tolist() == [False, True, False]
+
+def test_batched_reset_on_score(batch):
+    """Only the game that scored is re-served."""
+    batch.bx[1] = -5
+    player_scored, ai_scored, _ = batch.handle_collisions()
+    
+    assert ai_scored.tolist() == [False, True, False]
+    assert not player_scored.any()
+    assert batch.ai_score.tolist() == [0, 1, 0]
+    assert batch.bx[1] == SCREEN_WIDTH // 2 - BALL_SIZE // 2
+    assert batch.bx[0] == batch.bx[2] == SCREEN_WIDTH // 2
+
+@pytest.fixture
+def agent():
+    """A Q-learning agent with an empty fixed-point table."""
+    return QAgent()
+
+def test_q_update_matches_float_td_step(agent):
+    """One fixed-point TD step agrees with the float formula to within 1/256."""
+    state, next_state, action = (1, 2, 3, 4, 5), (0, 1, 2, 3, 4), 2
+    old_q, next_qs = 0.75, (0.5, 1.25, -0.25)
+    agent.q_table[_q_row(*state) + action] = round(old_q * 256)
+    agent.q_table[_q_row(*next_state):_q_row(*next_state) + 3] = [round(q * 256) for q in next_qs]
+    
+    _q_update(agent.q_table, *state, action, 2.0, agent.alpha, agent.gamma, *next_state)
+    
+    expected = old_q + agent.alpha * (2.0 + agent.gamma * max(next_qs) - old_q)
+    assert agent.q_values()[state + (action,)] == pytest.approx(expected, abs=1 / 256)
+
+def test_q_update_saturates(agent):
+    """Updates past the int16 range clamp instead of wrapping around."""
+    state = (0, 0, 0, 0, 0)
+    _q_update(agent.q_table, *state, 0, 1e6, 1.0, 0.0, *state)
+    _q_update(agent.q_table, *state, 1, -1e6, 1.0, 0.0, *state)
+    
+    assert agent.q_table[_q_row(*state)] == 32767
+    assert agent.q_table[_q_row(*state) + 1] == -32768
+
+def test_argmax3_tie_breaking(agent):
+    """Greedy actions pick the first maximum, like np.argmax."""
+    rng = np.random.default_rng(0)
+    agent.q_table[:] = rng.integers(-1, 2, agent.q_table.size) * 256  # plenty of ties
+    q_values = agent.q_values()
+    
+    for _ in range(200):
+        state = tuple(int(rng.integers(b)) for b in STATE_BINS)
+        assert _argmax3(agent.q_table, *state) == np.argmax(q_values[state])
+
+def test_discretize_clamps_and_matches_batch(batch):
+    """Out-of-range values land in the edge bins, and batched binning agrees."""
+    assert _discretize(-50.0, 1e4, -100.0, 100.0, -1.0) == (0, STATE_BINS[1] - 1, 0, STATE_BINS[3] - 1, 0)
+    
+    states = batch.discretize()
+    for i in range(batch.n):
+        expected = _discretize(float(batch.bx[i]), float(batch.by[i]), float(batch.vx[i]),
+                               float(batch.vy[i]), float(batch.rp_y[i]))
+        assert tuple(states[i]) == expected
+
+def test_epsilon_decays_in_batches(agent):
+    """Epsilon holds for 63 rewards and takes the compound step on the 64th."""
+    agent.epsilon = 0.5
+    for _ in range(63):
+        agent.decay_epsilon()
+    assert agent.epsilon == 0.5
+    
+    agent.decay_epsilon()
+    assert agent.epsilon == pytest.approx(0.5 * EPSILON_DECAY ** 64)
+    
+    # The floor still holds
+    agent.epsilon = EPSILON_MIN * 1.01
+    for _ in range(64):
+        agent.decay_epsilon()
+    assert agent.epsilon == EPSILON_MIN
+
+def test_bounce_sound_once_per_contact(monkeypatch):
+    """A ball resting on the wall plays one bounce, then may play again after 3 frames."""
+    class StubSound:
+        plays = 0
+        def play(self):
+            self.plays += 1
+    sound = StubSound()
+    monkeypatch.setattr(pong_ai, "bounce_sound", sound)
+    
+    game = PongGame()
+    game.ball.x, game.ball.y = SCREEN_WIDTH // 2, -1
+    game.ball.vx, game.ball.vy = 0, 0
+    for _ in range(3):
+        game.handle_collisions()
+    assert sound.plays == 1
+    
+    game.handle_collisions()
+    assert sound.plays == 2